@@ -6,10 +6,14 @@ Modules:
 - flask: For creating the web application and handling HTTP requests.
 - joblib: For loading the machine learning model.
 - numpy: For numerical operations.
-- csv: For reading postal code and location data.
-- pandas: For data manipulation and preparation.
+- pandas: For reading postal code and location data.
 - os: For accessing environment variables.
+- io: For holding the downloaded model in memory.
+- mmap: For memory-mapping the cached model file.
+- re: For parsing the version number out of model blob names.
 - azure.storage.blob: For interacting with Azure Blob Storage.
+- sklearn: For the single-row random forest fast path (XGBoost models use their booster directly).
+- threadpoolctl: For limiting the BLAS/OpenMP thread pools to one thread.
 
 Environment Variables:
 - AZURE_STORAGE_CONNECTION_STRING: Connection string for accessing Azure Blob Storage.
@@ -19,7 +23,8 @@ Routes:
 - `/predict`: Handles form submissions, validates input, and returns the predicted price or an error message.
 
 Key Features:
-- Downloads the latest `.pkl` model file from Azure Blob Storage.
+- Downloads the latest `.pkl` model file from Azure Blob Storage and loads it from memory.
+- Skips the download when the locally cached model matches the blob's ETag.
 - Loads postal code and location mappings from a CSV file.
 - Validates user input for room count, size, and postal code.
 - Prepares input data for the machine learning model and makes predictions.
@@ -34,14 +39,32 @@ Run the script to start the Flask application. Access the application in a web b
 
 """
 
+import os
+
+# Requests predict single rows, so native thread pools only add overhead and
+# oversubscribe the threaded workers. OpenMP reads this once when libgomp is
+# loaded, and estimators without n_jobs (HistGradientBoostingRegressor) would
+# otherwise open a team across all cores on every request.
+os.environ["OMP_NUM_THREADS"] = "1"
+
 from flask import Flask, render_template, request
+from markupsafe import Markup, escape
 import joblib
 import numpy as np
-import csv
 import pandas as pd
-import os
+import io
+import mmap
+import re
 from azure.storage.blob import BlobServiceClient
+from sklearn.ensemble import RandomForestRegressor
+from threadpoolctl import threadpool_limits
 import logging
+import warnings
+import threading
+from functools import lru_cache
+
+# The model was fitted on a DataFrame but is fed a plain ndarray row.
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -50,6 +73,10 @@ app = Flask(__name__, template_folder="../frontend/templates", static_url_path="
 
 AZURE_BLOB_CONN_STR = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 BLOB_CONTAINER = "immoscout-models"
+MODEL_PATH = "model/immoscout_model.pkl"
+ETAG_PATH = "model/immoscout_model.etag"
+MODEL_BLOB_PREFIX = "immoscout-model-"
+MODEL_BLOB_RE = re.compile(r"^immoscout-model-(\d+)\.pkl$")
 
 if not AZURE_BLOB_CONN_STR:
     raise ValueError("AZURE_STORAGE_CONNECTION_STRING is not set!")
@@ -57,35 +84,133 @@ if not AZURE_BLOB_CONN_STR:
 blob_service_client = BlobServiceClient.from_connection_string(AZURE_BLOB_CONN_STR)
 blob_client = blob_service_client.get_container_client(BLOB_CONTAINER)
 
-blobs = list(blob_client.list_blobs())
-filtered_blobs = [b for b in blobs if b.name.endswith(".pkl")]
+# Azure filters on the prefix server-side; the regex then keeps only
+# well-formed versioned artifacts and extracts their version number.
+versioned_blobs = (
+    (int(match.group(1)), blob)
+    for blob in blob_client.list_blobs(name_starts_with=MODEL_BLOB_PREFIX)
+    if (match := MODEL_BLOB_RE.match(blob.name))
+)
+latest = max(versioned_blobs, key=lambda version_blob: version_blob[0], default=None)
 
-if not filtered_blobs:
+if latest is None:
     raise FileNotFoundError("No .pkl files found in the Blob Storage!")
 
-latest_blob = sorted(
-    filtered_blobs,
-    key=lambda b: int(b.name.split('-')[-1].replace('.pkl', ''))
-)[-1]
-
-with open("model/immoscout_model.pkl", "wb") as download_file:
-    blob_stream = blob_client.download_blob(latest_blob.name)
-    download_file.write(blob_stream.readall())
-
-model = joblib.load("model/immoscout_model.pkl")
-
-plz_ort = {}
-with open("data/plz_ort.csv", mode="r") as infile:
-    reader = csv.reader(infile)
-    next(reader)
-    for rows in reader:
-        plz = int(rows[0])
-        ort = rows[1]
-        plz_ort[plz] = ort
+latest_blob = latest[1]
+
+cached_etag = None
+if os.path.exists(MODEL_PATH) and os.path.exists(ETAG_PATH):
+    with open(ETAG_PATH, "r") as etag_file:
+        cached_etag = etag_file.read().strip()
+
+if cached_etag == latest_blob.etag:
+    logger.info(f"ℹ️ Local model matches '{latest_blob.name}', skipping download.")
+    with open(MODEL_PATH, "rb") as model_file:
+        # Ask the kernel to start readahead on the whole file, then map it
+        # with eager prefaulting so unpickling reads from the page cache
+        # instead of issuing many small read() calls.
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(model_file.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        with mmap.mmap(
+            model_file.fileno(),
+            0,
+            prot=mmap.PROT_READ,
+            flags=mmap.MAP_PRIVATE | getattr(mmap, "MAP_POPULATE", 0),
+        ) as model_map:
+            model = joblib.load(model_map)
+else:
+    logger.info(f"📥 Downloading model '{latest_blob.name}'...")
+    # Unpickle straight from the downloaded bytes; the file on disk is only
+    # kept as a cache for the next start.
+    model_buffer = io.BytesIO()
+    blob_client.download_blob(latest_blob.name).readinto(model_buffer)
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    with open(MODEL_PATH, "wb") as model_file:
+        model_file.write(model_buffer.getbuffer())
+    with open(ETAG_PATH, "w") as etag_file:
+        etag_file.write(latest_blob.etag)
+    model_buffer.seek(0)
+    model = joblib.load(model_buffer)
+
+# Training may use all cores, but for single-row requests spinning up worker
+# threads costs more than it saves.
+if "n_jobs" in model.get_params():
+    model.set_params(n_jobs=1)
+threadpool_limits(1)
+
+# The feature layout is fixed once the model is loaded, so the one-hot row is
+# built once here and only the three relevant cells are set per request.
+FEATURE_INDEX = {name: i for i, name in enumerate(model.feature_names_in_)}
+TEMPLATE = np.zeros((1, len(model.feature_names_in_)), dtype=np.float32)
+# Swiss postal codes have four digits, so a flat array maps each one to its
+# one-hot column (-1 if the model has not seen it).
+PLZ_TO_COL = np.full(10000, -1, dtype=np.int32)
+for i, name in enumerate(model.feature_names_in_):
+    if name.startswith("plz_") and name[4:].isdigit():
+        PLZ_TO_COL[int(name[4:])] = i
+
+# For a single row, RandomForestRegressor.predict spends most of its time in
+# input validation and the joblib loop over trees. Calling the fitted trees'
+# compiled predict directly gives the same average without that overhead.
+if isinstance(model, RandomForestRegressor):
+    TREES = [estimator.tree_ for estimator in model.estimators_]
+
+    def predict_price(row):
+        return sum(tree.predict(row)[0, 0] for tree in TREES) / len(TREES)
+elif hasattr(model, "get_booster"):
+    # XGBoost: skip the sklearn wrapper and predict on the compiled booster.
+    BOOSTER = model.get_booster()
+
+    def predict_price(row):
+        return BOOSTER.inplace_predict(row, missing=model.missing)[0]
+else:
+    def predict_price(row):
+        return model.predict(row)[0]
+
+# Users often resubmit the same form values; the model is stateless, so
+# repeated inputs can be answered from the cache.
+_TLS = threading.local()
+
+
+@lru_cache(maxsize=4096)
+def predict_cached(rooms, size, postal_code):
+    # Each gthread worker thread reuses its own preallocated row.
+    row = getattr(_TLS, "row", None)
+    if row is None:
+        row = _TLS.row = TEMPLATE.copy()
+    else:
+        row.fill(0)
+    row[0, FEATURE_INDEX["rooms"]] = rooms
+    row[0, FEATURE_INDEX["size"]] = size
+    plz_col = PLZ_TO_COL[postal_code]
+    if plz_col >= 0:
+        row[0, plz_col] = 1
+    return float(predict_price(row))
+
+# Run one dummy prediction so the first real request does not pay for lazy
+# imports and buffer allocation inside the estimator.
+try:
+    predict_price(TEMPLATE)
+    logger.info("✅ Model warmed up.")
+except Exception as e:
+    logger.warning(f"⚠️ Model warm-up failed: {e}")
+
+plz_ort_df = pd.read_csv(
+    "data/plz_ort.csv", usecols=[0, 1], dtype={"plz": "int32", "ort": "string"}
+)
+plz_ort = dict(zip(plz_ort_df["plz"].tolist(), plz_ort_df["ort"].tolist()))
+
+PLZ_SET = frozenset(plz_ort)
+
+# The datalist never changes, so render it once instead of on every response.
+PLZ_OPTIONS_HTML = Markup("".join(
+    f'<option value="{plz}">{plz} - {escape(ort)}</option>'
+    for plz, ort in sorted(plz_ort.items())
+))
 
 @app.route("/")
 def index():
-    return render_template("index.html", plz_ort=plz_ort)
+    return render_template("index.html", plz_options_html=PLZ_OPTIONS_HTML)
 
 @app.route("/predict", methods=["POST"])
 def predict():
@@ -95,30 +220,15 @@ def predict():
         logger.info("📥 Received prediction request.")
         rooms = float(request.form["rooms"])
         size = float(request.form["size"])
-        postal_code = request.form["postal_code"]
-
-        if not postal_code.isdigit():
+        try:
+            postal_code = int(request.form["postal_code"])
+        except ValueError:
             raise ValueError("Die Postleitzahl muss eine Zahl sein.")
 
-        postal_code = int(postal_code)
-
-        if rooms <= 0 or size <= 0 or postal_code not in plz_ort:
+        if not (rooms > 0 and size > 0 and postal_code in PLZ_SET):
             raise ValueError("Ungültige Eingabewerte.")
 
-        input_df = pd.DataFrame(
-            [[rooms, size, postal_code]],
-            columns=["rooms", "size", "postal_code"]
-        )
-
-        input_df["postal_code"] = input_df["postal_code"].astype(str)
-        input_df = pd.get_dummies(input_df, columns=["postal_code"], prefix="plz")
-
-        for col in model.feature_names_in_:
-            if col not in input_df.columns:
-                input_df[col] = 0
-        input_df = input_df[model.feature_names_in_]
-
-        predicted_price = model.predict(input_df)[0]
+        predicted_price = predict_cached(rooms, size, postal_code)
         prediction = f"Prognostizierter Preis: CHF {predicted_price:.2f}"
         logger.info(f"✅ Prediction successful: {prediction}")
 
@@ -130,7 +240,7 @@ def predict():
         "index.html",
         prediction=prediction,
         error_message=error_message,
-        plz_ort=plz_ort,
+        plz_options_html=PLZ_OPTIONS_HTML,
     )
 
 if __name__ == "__main__":
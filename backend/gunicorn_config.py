@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the Flask prediction app.
+
+The app is preloaded in the master process, so the model is downloaded and
+unpickled once and the forked workers share its memory pages copy-on-write.
+Each worker runs several threads so concurrent predictions are not serialized.
+
+OpenMP is limited to one thread before the app is preloaded: libgomp is not
+fork-safe, and an OpenMP team started by the warm-up prediction in the master
+(e.g. for a HistGradientBoostingRegressor) would hang the forked workers.
+
+Usage:
+    gunicorn app:app --config gunicorn_config.py
+"""
+
+import os
+
+# Must be set before the preloaded app imports scikit-learn/libgomp.
+os.environ["OMP_NUM_THREADS"] = "1"
+
+bind = "0.0.0.0:5000"
+workers = 2 * (os.cpu_count() or 1)
+worker_class = "gthread"
+threads = 4
+preload_app = True
@@ -4,10 +4,98 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
+import atexit
+
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from pymongo import MongoClient
+from twisted.internet.threads import deferToThread
+
+_mongo_client = None
+
+
+def get_mongo_client(mongo_uri):
+    """
+    Returns the process-wide MongoClient, creating it on first use.
+
+    Building a client sets up topology monitoring and a connection pool, so it
+    is shared across spider runs in the same process and only closed at exit.
+    Wire compression uses zlib, which needs no extra package.
+    """
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = MongoClient(
+            mongo_uri, maxPoolSize=50, compressors="zlib", retryWrites=True
+        )
+        atexit.register(_mongo_client.close)
+    return _mongo_client
 
 
 class ImmoSpiderPipeline:
     def process_item(self, item, spider):
         return item
+
+
+class MongoPipeline:
+    """
+    Stores scraped listings in MongoDB.
+
+    Items are buffered and written with `insert_many` in batches. The blocking
+    pymongo call runs in Twisted's thread pool via `deferToThread`, so the
+    reactor keeps downloading and parsing pages while a batch is being written.
+    The collection is cleared when the spider opens.
+    """
+
+    def __init__(self, mongo_uri, mongo_db, mongo_collection, batch_size):
+        self.mongo_uri = mongo_uri
+        self.mongo_db = mongo_db
+        self.mongo_collection = mongo_collection
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            mongo_uri=crawler.settings.get("MONGO_URI"),
+            mongo_db=crawler.settings.get("MONGO_DB"),
+            mongo_collection=crawler.settings.get("MONGO_COLLECTION"),
+            batch_size=crawler.settings.getint("MONGO_BATCH_SIZE", 200),
+        )
+
+    def open_spider(self, spider):
+        """
+        Connects to MongoDB, clears all entries in the target collection and makes
+        sure the canton/postal code and page indexes exist.
+
+        Raises:
+            ValueError: If the `MONGO_URI` setting is not set.
+        """
+        if not self.mongo_uri:
+            raise ValueError(
+                "❌ MONGO_URI ist nicht gesetzt! Bitte ENV-Variable oder Secret einrichten."
+            )
+
+        client = get_mongo_client(self.mongo_uri)
+        self.collection = client[self.mongo_db][self.mongo_collection]
+        self.collection.delete_many({})
+        spider.logger.info("All old entries in the MongoDB have been deleted.")
+        self.collection.create_index([("canton", 1), ("postal_code", 1)])
+        self.collection.create_index("page")
+        self.buffer = []
+
+    def process_item(self, item, spider):
+        self.buffer.append(ItemAdapter(item).asdict())
+        if len(self.buffer) >= self.batch_size:
+            batch, self.buffer = self.buffer, []
+            return deferToThread(self._insert, batch).addCallback(lambda _: item)
+        return item
+
+    def close_spider(self, spider):
+        """
+        Writes the remaining buffered items. The shared client stays open.
+        """
+        batch, self.buffer = self.buffer, []
+        return deferToThread(self._insert, batch)
+
+    def _insert(self, batch):
+        if batch:
+            self.collection.insert_many(batch, ordered=False)
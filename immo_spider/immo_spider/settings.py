@@ -26,22 +26,37 @@ DOWNLOAD_DELAY = 2  # 2 Sekunden warten zwischen Requests
 # Optional für mehr "Zufall":
 RANDOMIZE_DOWNLOAD_DELAY = True  # Scrapy variiert leicht um den Delay herum
 
-# Falls gewünscht:
-CONCURRENT_REQUESTS = 1  # nur ein Request gleichzeitig
+# Parallele Requests: der DOWNLOAD_DELAY gilt weiterhin pro Domain, mehr
+# Concurrency überlappt nur die Wartezeit auf langsame Antworten
+CONCURRENT_REQUESTS = 64
+CONCURRENT_REQUESTS_PER_DOMAIN = 16
+SCHEDULER_PRIORITY_QUEUE = "scrapy.pqueues.DownloaderAwarePriorityQueue"
+
+# Tote Seiten nicht 180 Sekunden (Default) abwarten
+DOWNLOAD_TIMEOUT = 30
+
+# DNS-Auflösungen cachen, Thread-Pool auch für die MongoDB-Writes der Pipeline
+DNSCACHE_ENABLED = True
+DNSCACHE_SIZE = 10000
+REACTOR_THREADPOOL_MAXSIZE = 40
+
+# Cookies werden für die Ergebnislisten nicht benötigt
+COOKIES_ENABLED = False
 
 RETRY_ENABLED = True
-RETRY_TIMES = 3  # max. 3 Versuche
+RETRY_TIMES = 2  # max. 2 Wiederholungen
 RETRY_HTTP_CODES = [403, 429, 500, 502, 503, 504]  # typische Blockierungen
 
 import os
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = "immoscout_db"
 MONGO_COLLECTION = "listings"
+MONGO_BATCH_SIZE = 200  # Listings pro insert_many
 
-# Pipelines (falls nötig)
-# ITEM_PIPELINES = {
-#    'immo_spider.pipelines.ImmoSpiderPipeline': 300,
-# }
+# Pipelines: Listings werden gebündelt in MongoDB geschrieben
+ITEM_PIPELINES = {
+   "immo_spider.pipelines.MongoPipeline": 300,
+}
 
 # Logging
 LOG_LEVEL = "INFO"
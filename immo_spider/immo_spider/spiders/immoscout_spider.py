@@ -1,21 +1,24 @@
 """
 This module defines a Scrapy spider for scraping real estate listings from the 
 ImmoScout24 website. The spider extracts property details such as the number of 
-rooms, size, price, location, canton, and postal code, and stores the data in a 
-MongoDB database. It also handles pagination to scrape multiple pages of listings.
+rooms, size, price, location, canton, and postal code, and yields them as items 
+that `MongoPipeline` writes to a MongoDB database. It also handles pagination to 
+scrape multiple pages of listings.
 
 Classes:
     ImmoscoutSpider(scrapy.Spider): A Scrapy spider for crawling and extracting 
     real estate listings from ImmoScout24.
 
 Methods:
-    __init__(*args, **kwargs):
-        Initializes the spider, sets up a MongoDB connection, and clears the 
-        existing database collection.
+    start_requests():
+        Requests the first batch of result pages in parallel.
+
+    request_pages_up_to(last_page):
+        Requests all not yet requested result pages up to the given page.
 
     parse(response):
         Parses the response from the current page, extracts property listings, 
-        stores them in the database, and handles pagination.
+        yields them as items, and keeps further pages requested ahead.
 
     clean_rooms(rooms):
 
@@ -25,54 +28,82 @@ Methods:
 
     extract_postal_code(location):
 
-    closed(reason):
-        Ensures the MongoDB client connection is closed when the spider finishes 
-        execution.
-
 """
-
 import scrapy
 import re
-import os
-from pymongo import MongoClient
-from scrapy.utils.project import get_project_settings
+import sys
+from lxml import etree
+from parsel.csstranslator import css2xpath
+
+_DIGITS_RE = re.compile(r"(\d+)")
+_PLZ_RE = re.compile(r"(\d{4})")
+# Drops the currency and separator characters and turns a decimal comma
+# into a point in a single pass.
+_PRICE_TRANS = str.maketrans(
+    {"C": None, "H": None, "F": None, "’": None, "–": None, ",": "."}
+)
+
+
+def _compile_css(query):
+    """
+    Translates a CSS selector to XPath and compiles it once, so the per-listing
+    lookups skip parsel's translation and lxml's XPath compilation.
+    """
+    return etree.XPath(css2xpath(query), smart_strings=False)
+
+
+def _first(xpath, node):
+    """
+    Returns the first result of a compiled XPath on `node`, or None, like `.get()`.
+    """
+    result = xpath(node)
+    return result[0] if result else None
+
 
 class ImmoscoutSpider(scrapy.Spider):
     name = "immoscout_spider"
     allowed_domains = ["immoscout24.ch"]
-    start_urls = [
-        "https://www.immoscout24.ch/de/immobilien/mieten/kanton-zuerich?pn=1",
-    ]
+    page_url = "https://www.immoscout24.ch/de/immobilien/mieten/kanton-zuerich?pn={}"
+    page_burst = 10  # Seiten, die spekulativ im Voraus angefragt werden
+
+    _ROOMS_XP = _compile_css("strong:nth-of-type(1)::text")
+    _SIZE_XP = _compile_css("strong[title]::text")
+    _PRICE_XP = _compile_css(
+        "span.HgListingRoomsLivingSpacePrice_price_u9Vee:nth-of-type(3)::text"
+    )
+    _LOCATION_XP = _compile_css("address::text")
 
-    def __init__(self, *args, **kwargs):
+    def start_requests(self):
         """
-        Initializes the spider with necessary configurations and sets up a connection
-        to the MongoDB database. Ensures that the `MONGO_URI` environment variable is
-        set, and raises an error if it is not. Connects to the MongoDB instance, selects
-        the `immoscout_db` database, and clears all entries in the `listings` collection.
+        Requests the first `page_burst` result pages at once so they are fetched
+        in parallel instead of one after another.
 
-        Raises:
-            ValueError: If the `MONGO_URI` environment variable is not set.
+        Yields:
+            scrapy.Request: A request object for each of the first pages.
         """
-        super().__init__(*args, **kwargs)
-        settings = get_project_settings()
-        MONGO_URI = os.getenv("MONGO_URI")
+        self.last_requested_page = 0
+        yield from self.request_pages_up_to(self.page_burst)
 
-        if not MONGO_URI:
-            raise ValueError(
-                "❌ MONGO_URI ist nicht gesetzt! Bitte ENV-Variable oder Secret einrichten."
-            )
+    def request_pages_up_to(self, last_page):
+        """
+        Requests all result pages up to `last_page` that have not been requested yet.
 
-        self.client = MongoClient(MONGO_URI)
-        self.db = self.client["immoscout_db"]
-        self.collection = self.db["listings"]
-        self.collection.delete_many({})
-        self.logger.info("All old entries in the MongoDB have been deleted.")
+        Args:
+            last_page (int): The highest page number to request.
+
+        Yields:
+            scrapy.Request: A request object for each newly requested page.
+        """
+        first_page = self.last_requested_page + 1
+        self.last_requested_page = max(self.last_requested_page, last_page)
+        for page in range(first_page, last_page + 1):
+            yield scrapy.Request(self.page_url.format(page), callback=self.parse)
 
     def parse(self, response):
         """
-        Parses the response from the current page, extracts property listings, and stores them in the database.
-        Also handles pagination by generating a request for the next page.
+        Parses the response from the current page, extracts property listings, and yields them
+        as items for the MongoDB pipeline. Also handles pagination by keeping `page_burst` pages
+        requested ahead of every page that still contains listings.
 
         Args:
             response (scrapy.http.Response): The response object containing the HTML content of the current page.
@@ -88,14 +119,18 @@ class ImmoscoutSpider(scrapy.Spider):
 
         Behavior:
             - Logs the current page number and the number of listings found.
-            - If no listings are found, logs a message and stops the crawl.
-            - Cleans and processes extracted data before storing it in the database.
-            - Constructs the URL for the next page and yields a new request to continue crawling.
+            - If no listings are found, logs a message and requests no further pages.
+            - Cleans and processes extracted data before yielding it as an item.
+            - Requests the pages up to `page_burst` past the current one that are not requested yet.
 
         Yields:
-            scrapy.Request: A request object for the next page to be crawled.
+            dict: A cleaned listing, stored by `MongoPipeline`.
+            scrapy.Request: A request object for each further page to be crawled.
         """
         page_number = int(response.url.split("pn=")[-1])
+        # Interned so every listing of the page (and every page) shares one
+        # string object for the canton.
+        canton = sys.intern(response.url.rpartition("-")[2].partition("?")[0])
         listings = response.css("div.ResultList_listItem_j5Td_")
         self.logger.info(
             f"Scraping page {page_number} - {len(listings)} listings found."
@@ -108,34 +143,26 @@ class ImmoscoutSpider(scrapy.Spider):
             return
 
         for listing in listings:
-            rooms = listing.css("strong:nth-of-type(1)::text").get()
-            size = listing.css("strong[title]::text").get()
-            price = listing.css(
-                "span.HgListingRoomsLivingSpacePrice_price_u9Vee:nth-of-type(3)::text"
-            ).get()
-            location = listing.css("address::text").get()
+            node = listing.root
+            rooms = _first(self._ROOMS_XP, node)
+            size = _first(self._SIZE_XP, node)
+            price = _first(self._PRICE_XP, node)
+            location = _first(self._LOCATION_XP, node)
             rooms = self.clean_rooms(rooms)
             size = self.clean_size(size)
             price = self.clean_price(price)
-            canton = response.url.split("-")[-1].split("?")[0]
             postal_code = self.extract_postal_code(location)
-            self.collection.insert_one(
-                {
-                    "rooms": rooms,
-                    "size": size,
-                    "price": price,
-                    "location": location.strip() if location else None,
-                    "canton": canton,
-                    "postal_code": postal_code,
-                    "page": response.url,
-                }
-            )
-
-        next_page = page_number + 1
-        canton = response.url.split("-")[-1].split("?")[0]
-        next_page_url = f"https://www.immoscout24.ch/de/immobilien/mieten/kanton-zuerich?pn={next_page}"
-
-        yield scrapy.Request(next_page_url, callback=self.parse)
+            yield {
+                "rooms": rooms,
+                "size": size,
+                "price": price,
+                "location": location.strip() if location else None,
+                "canton": canton,
+                "postal_code": postal_code,
+                "page": response.url,
+            }
+
+        yield from self.request_pages_up_to(page_number + self.page_burst)
 
     def clean_rooms(self, rooms):
         """
@@ -153,7 +180,7 @@ class ImmoscoutSpider(scrapy.Spider):
             if no valid number is found.
         """
         if rooms:
-            match = re.search(r"(\d+)", rooms)
+            match = _DIGITS_RE.search(rooms)
             if match:
                 return int(match.group(1))
         return None
@@ -170,7 +197,7 @@ class ImmoscoutSpider(scrapy.Spider):
             otherwise None.
         """
         if size:
-            match = re.search(r"(\d+)", size)
+            match = _DIGITS_RE.search(size)
             if match:
                 return int(match.group(1))
         return None
@@ -191,9 +218,9 @@ class ImmoscoutSpider(scrapy.Spider):
             the input is invalid or conversion fails.
         """
         if price:
-            price = price.replace("CHF", "").replace("’", "").replace("–", "").strip()
+            price = price.translate(_PRICE_TRANS).strip()
             try:
-                return float(price.replace(",", "."))
+                return float(price)
             except ValueError:
                 self.logger.warning(f"Price could not be converted: {price}")
                 return None
@@ -210,21 +237,7 @@ class ImmoscoutSpider(scrapy.Spider):
             str or None: The extracted 4-digit postal code if found, otherwise None.
         """
         if location:
-            match = re.search(r"(\d{4})", location)
+            match = _PLZ_RE.search(location)
             if match:
                 return match.group(1)
         return None
-
-    def closed(self, reason):
-        """
-        Called when the spider is closed.
-
-        This method is triggered automatically when the spider finishes its execution,
-        either successfully or due to an error. It ensures that the database client
-        connection is properly closed to release resources.
-
-        Args:
-            reason (str): The reason why the spider was closed. This could be 'finished',
-                          'cancelled', or an error message.
-        """
-        self.client.close()
\ No newline at end of file
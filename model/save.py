@@ -1,9 +1,11 @@
 """
-This script uploads a machine learning model file to Azure Blob Storage, creating a new version
-of the model if previous versions exist.
+This script uploads a machine learning model file to Azure Blob Storage as a new version
+of the model, named after the UTC time of the upload.
 
 Modules:
     - os: Provides functions to interact with the operating system.
+    - mmap: Memory-maps the model file for the upload.
+    - datetime: Provides the UTC timestamp used as the model version.
     - azure.storage.blob: Contains classes for interacting with Azure Blob Storage.
 
 Environment Variables:
@@ -16,23 +18,29 @@ Constants:
 Workflow:
     1. Checks if the model file exists locally. If not, raises a FileNotFoundError.
     2. Attempts to create the specified Azure Blob Storage container. If it already exists, the exception is ignored.
-    3. Lists existing blobs in the container to determine the latest version of the model.
-    4. Calculates the new version number for the model.
-    5. Uploads the model file to Azure Blob Storage with the new version number in the filename.
-    6. Prints a success message indicating the version number of the uploaded model.
+    3. Derives the new version number from the current UTC time (YYYYMMDDHHMMSS).
+    4. Uploads the model file to Azure Blob Storage with the new version number in the filename.
+    5. Prints a success message indicating the version number of the uploaded model.
 
 Exceptions:
     - FileNotFoundError: Raised if the specified model file does not exist.
 """
 import os
-from azure.storage.blob import BlobServiceClient
+import mmap
+from datetime import datetime, timezone
+from azure.storage.blob import BlobServiceClient, BlobType
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 connect_str = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
-blob_service_client = BlobServiceClient.from_connection_string(connect_str)
+# 8 MiB blocks, and anything larger than one block goes up as a staged
+# block upload: by default the SDK sends files under 64 MiB in a single
+# PUT, which max_concurrency cannot parallelize.
+blob_service_client = BlobServiceClient.from_connection_string(
+    connect_str, max_block_size=8 * 1024 * 1024, max_single_put_size=8 * 1024 * 1024
+)
 
 model_file = "model/immoscout_model.pkl"
 container_name = "immoscout-models"
@@ -48,19 +56,26 @@ try:
 except Exception:
     logger.info(f"ℹ️ Container '{container_name}' already exists.")
 
-blobs = blob_service_client.get_container_client(container_name).list_blobs()
-existing_versions = [
-    int(blob.name.split("-")[-1].replace(".pkl", ""))
-    for blob in blobs
-    if blob.name.startswith("immoscout-model") and blob.name.endswith(".pkl")
-]
-new_version = max(existing_versions, default=0) + 1
+# A UTC timestamp as an integer is always larger than the older sequential
+# versions, so the backend's "highest number wins" still holds, and no
+# listing of the container is needed to pick it.
+new_version = int(datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S"))
 logger.info(f"✅ New model version will be: {new_version}")
 
 blob_client = blob_service_client.get_blob_client(
     container=container_name, blob=f"immoscout-model-{new_version}.pkl"
 )
-with open(model_file, "rb") as data:
-    blob_client.upload_blob(data)
+# The file is memory-mapped so the upload reads straight from the page cache
+# instead of holding its own copy of the model in memory.
+with open(model_file, "rb") as model_data, mmap.mmap(
+    model_data.fileno(), 0, access=mmap.ACCESS_READ
+) as data:
+    blob_client.upload_blob(
+        data,
+        length=len(data),
+        blob_type=BlobType.BlockBlob,
+        max_concurrency=8,
+        overwrite=True,
+    )
 
 logger.info(f"✅ Model uploaded as version {new_version} to Azure Blob Storage!")
\ No newline at end of file